@@ -8,33 +8,102 @@ Supporte ext4, btrfs, LUKS, sous-volumes btrfs, et configurations complexes.
 import os
 import sys
 import re
-import json
+import datetime
 import subprocess
 import logging
+import tempfile
+from operator import attrgetter
 from pathlib import Path
 from typing import Dict, List, Optional, Tuple
 from dataclasses import dataclass, field
-import configparser
 
-def setup_logging():
-    """Configure le systeme de logging"""
+#libbtrfsutil (optionnel, fourni par btrfs-progs) liste les sous-volumes sans lancer de processus
+try:
+    import btrfsutil
+except ImportError:
+    btrfsutil = None
+
+#regex et constantes compilées une seule fois au chargement du module
+_VALID_PREFIXES = ('UUID=', 'LABEL=', '/dev/', 'PARTUUID=', 'PARTLABEL=')
+_OCTAL_ESCAPE_RE = re.compile(r'\\([0-7]{3})')
+#sortie de lsblk -P: KEY="valeur", chaque octet non imprimable échappé en \xHH
+_PAIRS_RE = re.compile(rb'([\w:-]+)="([^"]*)"')
+_HEX_ESCAPE_RE = re.compile(rb'\\x([0-9a-fA-F]{2})')
+
+#points de montage et systèmes de fichiers ignorés (spéciaux, temporaires, virtuels)
+_SKIP_MOUNTS = frozenset({'none', 'swap'})
+_SKIP_FSTYPES = frozenset({
+    'swap', 'tmpfs', 'proc', 'sysfs', 'devtmpfs',
+    'cgroup', 'cgroup2', 'securityfs', 'debugfs', 'configfs'
+})
+
+#types lsblk des périphériques device-mapper, accessibles sous /dev/mapper/<nom>
+_DM_TYPES = frozenset({'crypt', 'lvm', 'dm', 'mpath'})
+
+#options de montage implicites, inutiles dans la commande mount générée
+_SKIP_OPTS = frozenset({'defaults', 'rw', 'auto', 'user', 'exec', 'suid'})
+
+#ordre de montage des points connus, les autres sont ordonnés par profondeur
+_MOUNT_ORDER = {
+    '/': 0,
+    '/boot': 10,
+    '/boot/efi': 11,
+    '/home': 20,
+    '/var': 21,
+    '/usr': 22,
+    '/opt': 23,
+    '/tmp': 24
+}
+
+def _unescape_mountinfo(value: str) -> str:
+    """Décode les séquences octales (\\040 pour un espace) de /proc/self/mountinfo"""
+    return _OCTAL_ESCAPE_RE.sub(lambda m: chr(int(m.group(1), 8)), value)
+
+def _unescape_lsblk(value: bytes) -> Optional[str]:
+    """Décode les séquences \\xHH de lsblk -P; une valeur vide devient None"""
+    #échappement octet par octet: on reconstitue les octets avant de décoder l'UTF-8
+    if b'\\x' in value:
+        value = _HEX_ESCAPE_RE.sub(lambda m: bytes([int(m.group(1), 16)]), value)
+    return value.decode('utf-8', 'replace') or None
+
+def _read_sysfs(path: str) -> Optional[str]:
+    """Lit un attribut sysfs (une ligne) ou retourne None s'il n'existe pas"""
     try:
-        logging.basicConfig(
-            level=logging.INFO,
-            format='%(asctime)s - %(levelname)s - %(message)s',
-            handlers=[
-                logging.FileHandler('/var/log/auto-archchroot.log'),
-                logging.StreamHandler()
-            ]
-        )
-    except Exception:
-        logging.basicConfig(
-            level=logging.INFO,
-            format='%(asctime)s - %(levelname)s - %(message)s',
-            handlers=[logging.StreamHandler()]
-        )
+        with open(path, 'rb') as f:
+            return f.read().strip().decode('utf-8', 'replace')
+    except OSError:
+        return None
 
-@dataclass
+def _read_udev_properties(path: str) -> Dict[str, str]:
+    """Lit les propriétés E:KEY=VALUE d'une entrée de la base udev (/run/udev/data/b<maj>:<min>)"""
+    props = {}
+    try:
+        with open(path, 'rb') as f:
+            data = f.read()
+    except OSError:
+        return props
+    for raw in data.splitlines():
+        if raw.startswith(b'E:'):
+            key, _, value = raw[2:].decode('utf-8', 'replace').partition('=')
+            props[key] = value
+    return props
+
+def setup_logging(log_file: str = '/var/log/auto-archchroot.log'):
+    """Configure le systeme de logging"""
+    handlers = [logging.StreamHandler()]
+    #évite la tentative d'ouverture (et l'exception) quand le dossier n'est pas accessible
+    if os.access(os.path.dirname(log_file), os.W_OK):
+        try:
+            handlers.insert(0, logging.FileHandler(log_file))
+        except OSError:
+            pass
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s',
+        handlers=handlers
+    )
+
+@dataclass(slots=True)
 class MountPoint:
     """Point de montage"""
     device: str
@@ -48,98 +117,348 @@ class MountPoint:
     order: int = 0
 
 
-setup_logging()
 logger = logging.getLogger(__name__)
 class SystemAnalyzer:
     """Analyse le système actuel pour générer le script de chroot"""
 
+    #stdin fermé, stderr ignoré, locale C: pas de traduction ni de décodage côté outils
+    _SUBPROC_KW = {
+        'stdin': subprocess.DEVNULL,
+        'stdout': subprocess.PIPE,
+        'stderr': subprocess.DEVNULL,
+        'env': {'PATH': '/usr/sbin:/usr/bin:/sbin:/bin', 'LC_ALL': 'C'},
+        'check': False,
+    }
+
     def __init__(self):
         self.luks_devices: Dict[str, str] = {}
         self.btrfs_subvolumes: Dict[str, List[str]] = {}
+        self._probed = False
     
-    def run_command(self, cmd: List[str]) -> Tuple[str, int]:
-        """Exécute une commande et retourne stdout et code de retour"""
+    def run_command(self, cmd: List[str]) -> Tuple[bytes, int]:
+        """Exécute une commande et retourne stdout (bytes, non décodé) et code de retour"""
         try:
-            result = subprocess.run(cmd, capture_output=True, text=True, check=False)
+            result = subprocess.run(cmd, **self._SUBPROC_KW)
             return result.stdout.strip(), result.returncode
         except Exception as e:
             logger.error(f"Erreur lors de l'exécution de {' '.join(cmd)}: {e}")
-            return "", 1
+            return b"", 1
     
-    def get_device_info(self) -> Dict[str, Dict]:
-        """Récupère les informations sur tous les périphériques de stockage"""
-        devices = {}
-        cmd = ['lsblk', '-J', '-o', 'NAME,UUID,FSTYPE,MOUNTPOINT,SIZE,TYPE']
+    def _probe_all(self):
+        """
+        Collecte une seule fois les informations de périphériques et construit les index
+        utilisés pendant le parsing de fstab (UUID -> périphérique, UUID LUKS -> périphérique,
+        mapper -> périphérique chiffré sous-jacent). sysfs et la base udev sont lus
+        directement; lsblk n'est lancé que si la base udev est absente ou incomplète.
+        """
+        self._device_info: Dict[str, Dict] = {}
+        self._by_uuid: Dict[str, str] = {}
+        self._luks_by_uuid: Dict[str, str] = {}
+        self._mapper_to_backing: Dict[str, str] = {}
+        self._mapper_cache: Dict[str, Tuple[bool, Optional[str], Optional[str]]] = {}
+        self._mountinfo = self._load_mountinfo()
+
+        scanned = self._scan_block_devices()
+        if scanned is None:
+            scanned = self._probe_with_lsblk()
+        self._device_info, self._by_uuid = scanned
+
+        for dev_path, dev_info in self._device_info.items():
+            #conteneurs LUKS: FSTYPE crypto_LUKS, plus besoin de blkid
+            #un conteneur sur LVM (ou autre mapper) s'ouvre via /dev/mapper/<nom>, comme le donnait blkid
+            if dev_info.get('fstype') == 'crypto_LUKS' and dev_info.get('uuid'):
+                luks_path = self._device_path(dev_path[5:])
+                self._luks_by_uuid[dev_info['uuid']] = luks_path
+                logger.debug("Périphérique LUKS détecté: %s (UUID: %s)", luks_path, dev_info['uuid'])
+            #dm-crypt mapping -> backing device (LUKS sur LVM: le parent est lui-même un mapper)
+            if dev_info.get('type') == 'crypt' and dev_info.get('pkname'):
+                dm_name = dev_path.rpartition('/')[2]
+                self._mapper_to_backing[dm_name] = self._device_path(dev_info['pkname'])
+        self._probed = True
+
+    def _device_path(self, name: str) -> str:
+        """
+        Chemin d'un périphérique à partir de son nom lsblk/sysfs
+        Args:
+            name: Nom du périphérique (sda2, vg-root...)
+        Returns:
+            /dev/mapper/<nom> pour un périphérique device-mapper, /dev/<nom> sinon
+        """
+        if self._device_info.get(f"/dev/{name}", {}).get('type') in _DM_TYPES:
+            return f"/dev/mapper/{name}"
+        return f"/dev/{name}"
+
+    def _info_for(self, device: str) -> Dict:
+        """
+        Informations collectées pour un chemin de périphérique
+        Args:
+            device: Chemin du périphérique (/dev/sdXN ou /dev/mapper/nom)
+        Returns:
+            Informations du périphérique, ou dictionnaire vide s'il est inconnu
+        """
+        info = self._device_info.get(device)
+        #lsblk nomme les mappers par leur nom dm, indexés en /dev/<nom>
+        if info is None and device.startswith('/dev/mapper/'):
+            info = self._device_info.get(f"/dev/{device[12:]}")
+        return info or {}
+
+    def _probe_with_lsblk(self) -> Tuple[Dict[str, Dict], Dict[str, str]]:
+        """
+        Collecte les informations de périphériques avec un seul appel à lsblk (repli sans base udev)
+        Returns:
+            Tuple (informations par périphérique, index UUID -> périphérique)
+        """
+        #-b: taille en octets, même forme que la lecture de sysfs
+        cmd = ['lsblk', '-P', '-b', '-o', 'NAME,UUID,FSTYPE,MOUNTPOINT,SIZE,TYPE,PKNAME']
         output, code = self.run_command(cmd)
-        
-        if code == 0:
+        if code != 0:
+            return {}, {}
+
+        pairs = []
+        uuid_to_device = {}
+        append = pairs.append
+        #une ligne par périphérique, déjà à plat et en ordre préfixe: PKNAME donne le parent
+        for line in output.splitlines():
+            row = {key.decode(): _unescape_lsblk(value) for key, value in _PAIRS_RE.findall(line)}
+            if 'NAME' not in row:
+                continue
+            full_name = f"/dev/{row['NAME']}"
+            uuid = row.get('UUID')
+            if uuid:
+                uuid_to_device.setdefault(uuid, full_name)
+            #peu de valeurs distinctes: chaînes internées, comparaisons par identité
+            fstype = row.get('FSTYPE')
+            dev_type = row.get('TYPE')
+            size = row.get('SIZE')
+            append((full_name, {
+                'uuid': uuid,
+                'fstype': sys.intern(fstype) if fstype else None,
+                'mountpoint': row.get('MOUNTPOINT'),
+                'size': int(size) if size and size.isdigit() else None,
+                'type': sys.intern(dev_type) if dev_type else None,
+                'pkname': row.get('PKNAME')
+            }))
+        #un seul dict() en C plutôt que des insertions (et redimensionnements) successives
+        return dict(pairs), uuid_to_device
+
+    def _scan_block_devices(self, sys_block: str = "/sys/class/block",
+                            udev_data: str = "/run/udev/data") -> Optional[Tuple[Dict[str, Dict], Dict[str, str]]]:
+        """
+        Construit les informations de périphériques depuis sysfs et la base udev, sans sous-processus
+        Args:
+            sys_block: Répertoire sysfs des périphériques bloc
+            udev_data: Répertoire de la base de données udev
+        Returns:
+            Tuple (informations par périphérique, index UUID -> périphérique),
+            ou None si sysfs ou la base udev ne sont pas disponibles ou incomplets
+        """
+        if not os.path.isdir(udev_data):
+            return None
+        try:
+            entries = sorted(os.scandir(sys_block), key=attrgetter('name'))
+        except OSError:
+            return None
+
+        pairs = []
+        uuid_to_device = {}
+        display_names = {}
+        has_fstype = False
+        for entry in entries:
+            base = entry.path
+            dev_num = _read_sysfs(f"{base}/dev")
+            if dev_num is None:
+                continue
+            props = _read_udev_properties(f"{udev_data}/b{dev_num}")
+            dm_name = _read_sysfs(f"{base}/dm/name")
+            #mêmes conventions que lsblk: les mappers sont nommés par leur nom dm
+            if dm_name is not None:
+                dm_uuid = _read_sysfs(f"{base}/dm/uuid") or ''
+                if dm_uuid.startswith('CRYPT-'):
+                    dev_type = 'crypt'
+                elif dm_uuid.startswith('LVM-'):
+                    dev_type = 'lvm'
+                else:
+                    dev_type = 'dm'
+                try:
+                    slaves = os.listdir(f"{base}/slaves")
+                except OSError:
+                    slaves = []
+                pkname = slaves[0] if len(slaves) == 1 else None
+                mounted = self._mountinfo.get(f"/dev/mapper/{dm_name}")
+            else:
+                if os.path.exists(f"{base}/partition"):
+                    dev_type = 'part'
+                    pkname = os.path.basename(os.path.dirname(os.path.realpath(base)))
+                else:
+                    dev_type = 'loop' if entry.name.startswith('loop') else 'disk'
+                    pkname = None
+                mounted = None
+            name = dm_name or entry.name
+            display_names[entry.name] = name
+            full_name = f"/dev/{name}"
+            mounted = mounted or self._mountinfo.get(full_name)
+            uuid = props.get('ID_FS_UUID')
+            if uuid:
+                uuid_to_device.setdefault(uuid, full_name)
+            fstype = props.get('ID_FS_TYPE')
+            sectors = _read_sysfs(f"{base}/size")
+            size = int(sectors) * 512 if sectors and sectors.isdigit() else None
+            #base udev périmée ou pas encore à jour (chroot, /run monté depuis l'hôte...):
+            #lsblk sonde alors les signatures lui-même via libblkid
+            if not props and size:
+                logger.warning(f"Entrée udev absente pour {full_name}, repli sur lsblk")
+                return None
+            if fstype:
+                has_fstype = True
+            pairs.append((full_name, {
+                'uuid': uuid,
+                'fstype': sys.intern(fstype) if fstype else None,
+                'mountpoint': mounted[0] if mounted else None,
+                'size': size,
+                'type': dev_type,
+                'pkname': pkname
+            }))
+        if pairs and not has_fstype:
+            logger.warning("Aucun système de fichiers dans la base udev, repli sur lsblk")
+            return None
+        #un parent dm (LUKS sur LVM...) est désigné par son nom noyau dans slaves/: on le remplace
+        #par son nom dm, comme lsblk; _device_path en déduit ensuite le chemin /dev/mapper/<nom>
+        for _, info in pairs:
+            if info['pkname'] in display_names:
+                info['pkname'] = display_names[info['pkname']]
+        return dict(pairs), uuid_to_device
+    
+    def _load_mountinfo(self, path: str = "/proc/self/mountinfo") -> Dict[str, Tuple[str, str, List[str]]]:
+        """
+        Lit l'état des montages courant sans lancer de sous-processus
+        Args:
+            path: Chemin du fichier mountinfo
+        Returns:
+            Dictionnaire source -> (point de montage, type de fs, options), premier montage par source
+        """
+        mounts = {}
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+        except OSError as e:
+            logger.warning(f"Impossible de lire {path}: {e}")
+            return mounts
+        for raw in data.splitlines():
+            fields = raw.decode('utf-8', 'replace').split(' ')
+            #champs optionnels terminés par '-', suivis de fstype et source
             try:
-                data = json.loads(output)
-                for device in data.get('blockdevices', []):
-                    self._process_device(device, devices)
-            except json.JSONDecodeError as e:
-                logger.error(f"Erreur parsing JSON lsblk: {e}")
-        return devices
+                sep = fields.index('-', 6)
+            except ValueError:
+                continue
+            if len(fields) < sep + 3:
+                continue
+            mount_point = _unescape_mountinfo(fields[4])
+            source = _unescape_mountinfo(fields[sep + 2])
+            mounts.setdefault(source, (mount_point, fields[sep + 1], fields[5].split(',')))
+        return mounts
+    
+    def _ensure_probed(self):
+        """Lance _probe_all au premier accès uniquement"""
+        if not self._probed:
+            self._probe_all()
     
-    def _process_device(self, device: dict, devices: dict, parent_name: str = ""):
-        """Traite récursivement les informations d'un périphérique"""
-        name = device.get('name', '')
-        full_name = f"/dev/{name}"
-        devices[full_name] = {
-            'uuid': device.get('uuid'),
-            'fstype': device.get('fstype'),
-            'mountpoint': device.get('mountpoint'),
-            'size': device.get('size'),
-            'type': device.get('type')
-        }
-        for child in device.get('children', []):
-            self._process_device(child, devices, name)
+    def invalidate(self):
+        """Force une nouvelle collecte des informations de périphériques au prochain accès"""
+        self._probed = False
+        self.btrfs_subvolumes.clear()
+    
+    def get_device_info(self) -> Dict[str, Dict]:
+        """Récupère les informations sur tous les périphériques de stockage"""
+        self._ensure_probed()
+        return self._device_info
+    
+    def get_uuid_index(self) -> Dict[str, str]:
+        """Retourne l'index UUID -> chemin du périphérique"""
+        self._ensure_probed()
+        return self._by_uuid
     
     def detect_luks_devices(self) -> Dict[str, str]:
         """Détecte les périphériques LUKS et leurs mappings"""
-        luks_devices = {}
-        cmd = ['blkid', '-t', 'TYPE=crypto_LUKS']
-        output, code = self.run_command(cmd)
-        
-        if code == 0:
-            for line in output.split('\n'):
-                if line.strip():
-                    match = re.match(r'^([^:]+):\s+UUID="([^"]+)".*TYPE="crypto_LUKS"', line)
-                    if match:
-                        device, uuid = match.groups()
-                        luks_devices[uuid] = device
-                        logger.info(f"Périphérique LUKS détecté: {device} (UUID: {uuid})")
-        
-        return luks_devices
+        self._ensure_probed()
+        return self._luks_by_uuid
     
     def detect_btrfs_subvolumes(self, device: str) -> List[str]:
-        """Détecte les sous-volumes btrfs sur un périphérique"""
+        """Détecte les sous-volumes btrfs sur un périphérique (résultat mémorisé par périphérique)"""
+        if device in self.btrfs_subvolumes:
+            return self.btrfs_subvolumes[device]
+        #déjà monté: pas besoin de montage temporaire
+        mounted_on = self._find_mountpoint(device)
+        if mounted_on:
+            subvolumes = self._list_btrfs_subvolumes(mounted_on)
+            self.btrfs_subvolumes[device] = subvolumes
+            return subvolumes
+
         subvolumes = []
-        temp_mount = "/tmp/btrfs_temp_mount"
-        os.makedirs(temp_mount, exist_ok=True)
-        try:
+        #répertoire unique par appel: pas de collision entre exécutions concurrentes
+        with tempfile.TemporaryDirectory(prefix='btrfs_probe_') as temp_mount:
             mount_cmd = ['mount', device, temp_mount]
             _, code = self.run_command(mount_cmd)
-            
             if code == 0:
-                subvol_cmd = ['btrfs', 'subvolume', 'list', temp_mount]
-                output, code = self.run_command(subvol_cmd)
-                
-                if code == 0:
-                    for line in output.split('\n'):
-                        if line.strip():
-                            match = re.search(r'path\s+(.+)$', line)
-                            if match:
-                                subvol_path = match.group(1)
-                                subvolumes.append(subvol_path)
-                                logger.info(f"Sous-volume btrfs trouvé: {subvol_path}")
-        finally:
-            self.run_command(['umount', temp_mount])
+                try:
+                    subvolumes = self._list_btrfs_subvolumes(temp_mount)
+                finally:
+                    self.run_command(['umount', temp_mount])
+
+        self.btrfs_subvolumes[device] = subvolumes
+        return subvolumes
+
+    def _find_mountpoint(self, device: str) -> Optional[str]:
+        """
+        Cherche un point de montage existant pour un périphérique (mountinfo puis lsblk),
+        ou pour son mapper s'il s'agit d'un conteneur LUKS ouvert
+        Args:
+            device: Chemin du périphérique (/dev/sdXN ou /dev/mapper/nom)
+        Returns:
+            Point de montage ou None si le périphérique n'est pas monté
+        """
+        self._ensure_probed()
+        mounted = self._mountinfo.get(device)
+        if mounted:
+            return mounted[0]
+        mountpoint = self._info_for(device).get('mountpoint')
+        if mountpoint:
+            return mountpoint
+        #conteneur LUKS: le système de fichiers est monté via son mapper
+        for dm_name, backing in self._mapper_to_backing.items():
+            if backing == device:
+                return self._find_mountpoint(f"/dev/mapper/{dm_name}")
+        return None
+
+    def _list_btrfs_subvolumes(self, path: str) -> List[str]:
+        """
+        Liste les sous-volumes d'un système de fichiers btrfs monté
+        Args:
+            path: Point de montage du système de fichiers btrfs
+        Returns:
+            Liste des chemins de sous-volumes
+        """
+        if btrfsutil is not None:
             try:
-                os.rmdir(temp_mount)
-            except:
-                pass
+                #top=5: tous les sous-volumes depuis la racine, comme btrfs subvolume list
+                subvolumes = [subvol_path for subvol_path, _ in btrfsutil.SubvolumeIterator(path, top=5)]
+            except btrfsutil.BtrfsUtilError as e:
+                logger.warning(f"libbtrfsutil indisponible pour {path}, repli sur btrfs: {e}")
+            else:
+                if logger.isEnabledFor(logging.DEBUG):
+                    for subvol_path in subvolumes:
+                        logger.debug("Sous-volume btrfs trouvé: %s", subvol_path)
+                return subvolumes
 
+        subvolumes = []
+        output, code = self.run_command(['btrfs', 'subvolume', 'list', path])
+        if code == 0:
+            #"ID 256 gen 10 top level 5 path @home": le premier ' path ' est le libellé du champ
+            for line in output.splitlines():
+                _, sep, subvol = line.partition(b' path ')
+                if sep:
+                    subvol_path = subvol.strip().decode('utf-8', 'replace')
+                    subvolumes.append(subvol_path)
+                    logger.debug("Sous-volume btrfs trouvé: %s", subvol_path)
         return subvolumes
     
     def _detect_luks_for_uuid(self, uuid: str, luks_devices: Dict[str, str]) -> Tuple[bool, Optional[str]]:
@@ -163,23 +482,70 @@ class SystemAnalyzer:
         Returns:
             Tuple (is_luks, luks_device_path, uuid)
         """
-        dm_name = device.split('/')[-1]
-        luks_cmd = ['cryptsetup', 'status', dm_name]
-        output, code = self.run_command(luks_cmd)
-        
-        if code != 0 or 'is active' not in output:
-            return False, None, None
-        match = re.search(r'device:\s+(/dev/\S+)', output)
-        if not match:
-            return True, None, None
-
-        luks_device = match.group(1)
-        uuid_cmd = ['blkid', '-o', 'value', '-s', 'UUID', luks_device]
-        uuid_output, uuid_code = self.run_command(uuid_cmd)
-        uuid = uuid_output.strip() if uuid_code == 0 and uuid_output else None
-        
-        return True, luks_device, uuid
+        self._ensure_probed()
+        #plusieurs entrées fstab (sous-volumes btrfs) partagent souvent le même mapper
+        cached = self._mapper_cache.get(device)
+        if cached is not None:
+            return cached
+        dm_name = device.rpartition('/')[2]
+        luks_device = self._mapper_to_backing.get(dm_name)
+        if luks_device is None:
+            luks_device = self._luks_backing_from_sysfs(device)
+        if luks_device is None:
+            result = (False, None, None)
+        else:
+            uuid = self._info_for(luks_device).get('uuid')
+            if uuid is None:
+                uuid = self._uuid_from_udev(luks_device)
+            result = (True, luks_device, uuid)
+        self._mapper_cache[device] = result
+        return result
+
+    def _luks_backing_from_sysfs(self, device: str, sys_block: str = "/sys/class/block") -> Optional[str]:
+        """
+        Retrouve le périphérique LUKS sous-jacent d'un mapper via dm-N/slaves dans sysfs
+        Args:
+            device: Chemin du périphérique mapper
+            sys_block: Répertoire sysfs des périphériques bloc
+        Returns:
+            Chemin du périphérique LUKS ou None si le mapper n'est pas un volume LUKS
+        """
+        base = f"{sys_block}/{os.path.basename(os.path.realpath(device))}"
+        #uuid dm: CRYPT-LUKS* pour LUKS, LVM-* pour LVM, etc.
+        dm_uuid = _read_sysfs(f"{base}/dm/uuid")
+        if dm_uuid is not None and not dm_uuid.startswith('CRYPT-LUKS'):
+            return None
+        try:
+            slaves = os.listdir(f"{base}/slaves")
+        except OSError:
+            return None
+        if len(slaves) != 1:
+            return None
+        backing = f"/dev/{slaves[0]}"
+        if dm_uuid is not None:
+            return backing
+        #sans uuid dm, un mapper LVM a aussi un slave: ne garder que les conteneurs LUKS connus
+        if self._device_info.get(backing, {}).get('fstype') == 'crypto_LUKS' \
+                or backing in self._luks_by_uuid.values():
+            return backing
+        return None
     
+    def _uuid_from_udev(self, device: str, sys_block: str = "/sys/class/block",
+                        udev_data: str = "/run/udev/data") -> Optional[str]:
+        """
+        Lit l'UUID d'un périphérique dans la base udev (repli si absent des informations collectées)
+        Args:
+            device: Chemin du périphérique (/dev/sdXN)
+            sys_block: Répertoire sysfs des périphériques bloc
+            udev_data: Répertoire de la base de données udev
+        Returns:
+            UUID du système de fichiers ou None
+        """
+        dev_num = _read_sysfs(f"{sys_block}/{os.path.basename(device)}/dev")
+        if dev_num is None:
+            return None
+        return _read_udev_properties(f"{udev_data}/b{dev_num}").get('ID_FS_UUID') or None
+
     def _extract_btrfs_subvolume(self, options: List[str]) -> Optional[str]:
         """
         Extrait le nom du sous-volume btrfs des options de montage
@@ -188,10 +554,7 @@ class SystemAnalyzer:
         Returns:
             Nom du sous-volume ou None
         """
-        for opt in options:
-            if opt.startswith('subvol='):
-                return opt[7:]
-        return None
+        return next((opt[7:] for opt in options if opt.startswith('subvol=')), None)
     
     def _parse_fstab_line(self, line: str, line_num: int) -> Optional[Tuple[str, str, str, List[str]]]:
         """
@@ -206,13 +569,14 @@ class SystemAnalyzer:
         # Ignore empty lines and comments
         if not line or line.startswith('#'):
             return None
-        parts = line.split()
+        #maxsplit=4: les 4 premiers champs sont isolés, dump/pass restent groupés dans parts[4]
+        parts = line.split(None, 4)
         if len(parts) < 4:
             logger.warning(f"Ligne fstab invalide {line_num}: {line}")
             return None
         device = parts[0]
         mount_point = parts[1]
-        fs_type = parts[2]
+        fs_type = sys.intern(parts[2])
         options = parts[3].split(',')
         
         # Valide les champs critiques
@@ -231,40 +595,48 @@ class SystemAnalyzer:
         Returns:
             True si l'entrée est valide pour notre usage
         """
-        #skip special mount points
-        if mount_point in ['none', 'swap'] or fs_type in ['swap', 'tmpfs', 'proc', 'sysfs', 'devtmpfs']:
-            return False
-        
-        #tmp and virtual
-        if fs_type in ['cgroup', 'cgroup2', 'securityfs', 'debugfs', 'configfs']:
+        #skip special, tmp and virtual mount points
+        if mount_point in _SKIP_MOUNTS or fs_type in _SKIP_FSTYPES:
             return False
 
-        valid_device_prefixes = ['UUID=', 'LABEL=', '/dev/', 'PARTUUID=', 'PARTLABEL=']
-        if not any(device.startswith(prefix) for prefix in valid_device_prefixes):
+        if not device.startswith(_VALID_PREFIXES):
             logger.warning(f"Format de périphérique non supporté: {device}")
             return False
         
         return True
     
-    def _resolve_device_uuid(self, uuid: str, device_info: Dict[str, Dict]) -> Optional[str]:
+    def _build_uuid_index(self, device_info: Dict[str, Dict]) -> Dict[str, str]:
+        """
+        Construit l'index inverse UUID -> chemin du périphérique
+        Args:
+            device_info: Informations sur les périphériques
+        Returns:
+            Dictionnaire UUID -> chemin (premier périphérique rencontré)
+        """
+        uuid_to_device = {}
+        for dev_path, dev_info in device_info.items():
+            uuid = dev_info.get('uuid')
+            if uuid:
+                uuid_to_device.setdefault(uuid, dev_path)
+        return uuid_to_device
+
+    def _resolve_device_uuid(self, uuid: str, uuid_to_device: Dict[str, str]) -> Optional[str]:
         """
         Résout un UUID vers un chemin de périphérique
         
         Args:
             uuid: UUID à résoudre
-            device_info: Informations sur les périphériques
+            uuid_to_device: Index UUID -> chemin du périphérique
             
         Returns:
             Chemin du périphérique ou None si non trouvé
         """
-        for dev_path, dev_info in device_info.items():
-            if dev_info.get('uuid') == uuid:
-                return dev_path
-        return None
+        return uuid_to_device.get(uuid)
 
     def _create_mount_point(self, device: str, mount_point: str, fs_type: str, 
                           options: List[str], device_info: Dict[str, Dict], 
-                          luks_devices: Dict[str, str]) -> MountPoint:
+                          luks_devices: Dict[str, str],
+                          uuid_to_device: Optional[Dict[str, str]] = None) -> MountPoint:
         """
         Crée un objet MountPoint à partir des informations parsées
         Args:
@@ -274,6 +646,7 @@ class SystemAnalyzer:
             options: Options de montage
             device_info: Informations sur les périphériques
             luks_devices: Mapping des périphériques LUKS
+            uuid_to_device: Index UUID -> périphérique (construit depuis device_info si absent)
         Returns:
             Objet MountPoint configuré
         """
@@ -290,14 +663,17 @@ class SystemAnalyzer:
             uuid = device[5:]
             mp.uuid = uuid
             #uuid to device res
-            resolved_device = self._resolve_device_uuid(uuid, device_info)
+            if uuid_to_device is None:
+                uuid_to_device = self._build_uuid_index(device_info)
+            resolved_device = self._resolve_device_uuid(uuid, uuid_to_device)
             if resolved_device:
                 mp.device = resolved_device
-            #luks check
-            is_luks, luks_device = self._detect_luks_for_uuid(uuid, luks_devices)
-            if is_luks:
-                mp.is_luks = True
-                mp.luks_device = luks_device
+            #luks check (aucun appel sur les systèmes sans LUKS)
+            if luks_devices:
+                is_luks, luks_device = self._detect_luks_for_uuid(uuid, luks_devices)
+                if is_luks:
+                    mp.is_luks = True
+                    mp.luks_device = luks_device
         #/dev/mapper/ handling
         elif device.startswith('/dev/mapper/'):
             is_luks, luks_device, uuid = self._detect_luks_for_mapper(device)
@@ -325,162 +701,204 @@ class SystemAnalyzer:
             PermissionError: Si le fichier n'est pas accessible
         """
 
-        if not os.path.exists(fstab_path):
-            raise FileNotFoundError(f"Fichier fstab non trouvé: {fstab_path}")
-    
-        mount_points = []
+        #lecture en un seul read() binaire, sans TextIOWrapper ni stat() préalable,
+        #avant toute interrogation du système
+        try:
+            with open(fstab_path, 'rb') as f:
+                data = f.read()
+        except FileNotFoundError:
+            raise FileNotFoundError(f"Fichier fstab non trouvé: {fstab_path}") from None
+        except Exception as e:
+            logger.error(f"Erreur lors de la lecture de {fstab_path}: {e}")
+            raise
+
         #get sys info
         try:
             device_info = self.get_device_info()
+            uuid_to_device = self.get_uuid_index()
             luks_devices = self.detect_luks_devices()
         except Exception as e:
             logger.error(f"Erreur lors de la récupération des informations système: {e}")
             device_info = {}
+            uuid_to_device = {}
             luks_devices = {}
         #fstab parsing
-        try:
-            with open(fstab_path, 'r', encoding='utf-8') as f:
-                for line_num, line in enumerate(f, 1):
-                    parsed = self._parse_fstab_line(line, line_num)
-                    if parsed is None:
-                        continue
-                    device, mount_point, fs_type, options = parsed
-                    try:
-                        mp = self._create_mount_point(
-                            device, mount_point, fs_type, options, 
-                            device_info, luks_devices
-                        )
-                        mount_points.append(mp)
-                        logger.info(f"Point de montage trouvé: {mp.mount_point} ({mp.device})")
-                    except Exception as e:
-                        logger.error(f"Erreur lors du traitement de la ligne {line_num}: {e}")
-                        continue
-        except Exception as e:
-            logger.error(f"Erreur lors de la lecture de {fstab_path}: {e}")
-            raise
+        #appelables chauds en variables locales (évite les LOAD_ATTR par ligne)
+        mount_points = []
+        _parse = self._parse_fstab_line
+        _build = self._create_mount_point
+        append = mount_points.append
+        for line_num, raw in enumerate(data.splitlines(), 1):
+            parsed = _parse(raw.decode('utf-8', 'replace'), line_num)
+            if parsed is None:
+                continue
+            try:
+                mp = _build(*parsed, device_info, luks_devices, uuid_to_device)
+            except Exception as e:
+                logger.error(f"Erreur lors du traitement de la ligne {line_num}: {e}")
+                continue
+            append(mp)
+            logger.debug("Point de montage trouvé: %s (%s)", mp.mount_point, mp.device)
         #sort mp by order
-        mount_points.sort(key=lambda x: x.order)
+        mount_points.sort(key=attrgetter('order'))
         return mount_points
 
     def _get_mount_order(self, mount_point: str) -> int:
         """Détermine l'ordre de montage basé sur la hiérarchie des points de montage"""
-        order_map = {
-            '/': 0,
-            '/boot': 10,
-            '/boot/efi': 11,
-            '/home': 20,
-            '/var': 21,
-            '/usr': 22,
-            '/opt': 23,
-            '/tmp': 24
-        }
-        if mount_point in order_map:
-            return order_map[mount_point]
-        #for custom mount points, heuristic on depth
-        return 30 + len(mount_point.split('/'))
+        #for custom mount points, heuristic on depth (count('/') + 1 == len(split('/')))
+        return _MOUNT_ORDER.get(mount_point, 31 + mount_point.count('/'))
+
+#sections statiques du script généré (aucune substitution à l'exécution)
+_SCRIPT_HEADER = r"""
+set -euo pipefail
+
+# Couleurs pour les messages
+RED="\033[31m"
+GREEN="\033[32m"
+YELLOW="\033[33m"
+BLUE="\033[34m"
+RESET="\033[0m"
+
+# Point de montage de base
+MOUNT_ROOT="/mnt"
+
+# Vérification des privilèges root
+if [[ $EUID -ne 0 ]]; then
+    echo -e "${RED}Ce script doit être exécuté en tant que root${RESET}"
+    exit 1
+fi
+
+"""
+
+_UTILITY_FUNCTIONS = r"""# Fonctions utilitaires
+log_info() {
+    echo -e "${BLUE}[INFO]${RESET} $1"
+}
+
+log_success() {
+    echo -e "${GREEN}[SUCCESS]${RESET} $1"
+}
+
+log_warning() {
+    echo -e "${YELLOW}[WARNING]${RESET} $1"
+}
+
+log_error() {
+    echo -e "${RED}[ERROR]${RESET} $1"
+}
+
+check_device_exists() {
+    local device="$1"
+    if [[ ! -e "$device" ]]; then
+        log_error "Périphérique non trouvé: $device"
+        return 1
+    fi
+    return 0
+}
+
+create_mount_point() {
+    local mount_point="$1"
+    if [[ ! -d "$mount_point" ]]; then
+        mkdir -p "$mount_point"
+        log_info "Point de montage créé: $mount_point"
+    fi
+}
+
+"""
+
+_PSEUDO_FILESYSTEMS = r"""# Montage des pseudo-systèmes de fichiers
+mount_pseudo_filesystems() {
+    log_info "Montage des pseudo-systèmes de fichiers..."
+
+    create_mount_point "$MOUNT_ROOT/dev"
+    if ! mountpoint -q "$MOUNT_ROOT/dev"; then
+        mount --bind "/dev" "$MOUNT_ROOT/dev"
+        log_success "Pseudo-FS monté: /dev"
+    fi
+    create_mount_point "$MOUNT_ROOT/proc"
+    if ! mountpoint -q "$MOUNT_ROOT/proc"; then
+        mount --bind "/proc" "$MOUNT_ROOT/proc"
+        log_success "Pseudo-FS monté: /proc"
+    fi
+    create_mount_point "$MOUNT_ROOT/sys"
+    if ! mountpoint -q "$MOUNT_ROOT/sys"; then
+        mount --bind "/sys" "$MOUNT_ROOT/sys"
+        log_success "Pseudo-FS monté: /sys"
+    fi
+    create_mount_point "$MOUNT_ROOT/run"
+    if ! mountpoint -q "$MOUNT_ROOT/run"; then
+        mount --bind "/run" "$MOUNT_ROOT/run"
+        log_success "Pseudo-FS monté: /run"
+    fi
+
+    # Montage spécial pour /dev/pts si nécessaire
+    if [[ -d "$MOUNT_ROOT/dev/pts" ]] && ! mountpoint -q "$MOUNT_ROOT/dev/pts"; then
+        mount -t devpts devpts "$MOUNT_ROOT/dev/pts"
+    fi
+
+}
+
+"""
 
 class ScriptGenerator:
     """Génère le script perform-chroot.sh"""
     def __init__(self, mount_points: List[MountPoint]):
         self.mount_points = mount_points
-        self.script_lines = []
     
     def generate_script(self, output_path: str = "/home/perform-chroot.sh"):
-        """Génère le script complet"""
-        self.script_lines = []        
-        self._add_header()        
-        self._add_utility_functions()    
-        self._add_luks_handling()  
-        self._add_filesystem_mounting()    
-        self._add_pseudo_filesystems()       
-        self._add_chroot_execution()
-        self._add_cleanup()
-
+        """Génère le script complet, écrit section par section dans le fichier"""
+        #écriture dans un fichier temporaire: un script à moitié écrit ne remplace jamais l'ancien.
+        #mkstemp crée un nom imprévisible en O_EXCL: pas de lien symbolique suivi
+        fd, tmp_path = tempfile.mkstemp(prefix='.perform-chroot.', dir=os.path.dirname(output_path) or '.')
         try:
-            with open(output_path, 'w') as f:
-                f.write('\n'.join(self.script_lines))
+            with os.fdopen(fd, 'w') as f:
+                self._add_header(f)
+                self._add_utility_functions(f)
+                self._add_luks_handling(f)
+                self._add_filesystem_mounting(f)
+                self._add_pseudo_filesystems(f)
+                self._add_chroot_execution(f)
+                self._add_cleanup(f)
+                #sur le descripteur ouvert plutôt que sur le chemin
+                os.fchmod(f.fileno(), 0o755)
             
-            os.chmod(output_path, 0o755)
+            os.replace(tmp_path, output_path)
             logger.info(f"Script généré avec succès: {output_path}")
             
         except Exception as e:
             logger.error(f"Erreur lors de l'écriture du script: {e}")
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
             raise
     
-    def _add_header(self):
+    def _write(self, f, lines: List[str]):
+        """Écrit un bloc de lignes du script"""
+        f.write('\n'.join(lines) + '\n')
+    
+    def _add_header(self, f):
         """Ajoute l'en-tête du script"""
-        self.script_lines.extend([
+        self._write(f, [
             "#!/bin/bash",
             "# Généré automatiquement par auto-archchroot",
-            f"# Date de génération: {subprocess.run(['date'], capture_output=True, text=True).stdout.strip()}",
-            "",
-            "set -euo pipefail",
-            "",
-            "# Couleurs pour les messages",
-            'RED="\\033[31m"',
-            'GREEN="\\033[32m"',
-            'YELLOW="\\033[33m"',
-            'BLUE="\\033[34m"',
-            'RESET="\\033[0m"',
-            "",
-            "# Point de montage de base",
-            "MOUNT_ROOT=\"/mnt\"",
-            "",
-            "# Vérification des privilèges root",
-            "if [[ $EUID -ne 0 ]]; then",
-            '    echo -e "${RED}Ce script doit être exécuté en tant que root${RESET}"',
-            "    exit 1",
-            "fi",
-            ""
+            #même format que la sortie par défaut de date(1), sans lancer de processus
+            f"# Date de génération: {datetime.datetime.now().astimezone().strftime('%a %b %e %H:%M:%S %Z %Y')}",
         ])
+        f.write(_SCRIPT_HEADER)
     
-    def _add_utility_functions(self):
+    def _add_utility_functions(self, f):
         """Ajoute les fonctions utilitaires"""
-        self.script_lines.extend([
-            "# Fonctions utilitaires",
-            "log_info() {",
-            '    echo -e "${BLUE}[INFO]${RESET} $1"',
-            "}",
-            "",
-            "log_success() {",
-            '    echo -e "${GREEN}[SUCCESS]${RESET} $1"',
-            "}",
-            "",
-            "log_warning() {",
-            '    echo -e "${YELLOW}[WARNING]${RESET} $1"',
-            "}",
-            "",
-            "log_error() {",
-            '    echo -e "${RED}[ERROR]${RESET} $1"',
-            "}",
-            "",
-            "check_device_exists() {",
-            "    local device=\"$1\"",
-            "    if [[ ! -e \"$device\" ]]; then",
-            '        log_error "Périphérique non trouvé: $device"',
-            "        return 1",
-            "    fi",
-            "    return 0",
-            "}",
-            "",
-            "create_mount_point() {",
-            "    local mount_point=\"$1\"",
-            "    if [[ ! -d \"$mount_point\" ]]; then",
-            "        mkdir -p \"$mount_point\"",
-            '        log_info "Point de montage créé: $mount_point"',
-            "    fi",
-            "}",
-            ""
-        ])
+        f.write(_UTILITY_FUNCTIONS)
     
-    def _add_luks_handling(self):
+    def _add_luks_handling(self, f):
         """Ajoute la gestion des périphériques LUKS"""
         luks_devices = [mp for mp in self.mount_points if mp.is_luks]
         
         if not luks_devices:
             return
         
-        self.script_lines.extend([
+        self._write(f, [
             "# Gestion des périphériques LUKS",
             "unlock_luks_devices() {",
             "    log_info \"Déverrouillage des périphériques LUKS...\"",
@@ -489,7 +907,7 @@ class ScriptGenerator:
         
         for mp in luks_devices:
             luks_name = f"luks_{mp.uuid[:8]}" if mp.uuid else "luks_device"
-            self.script_lines.extend([
+            self._write(f, [
                 f"    # Déverrouillage de {mp.luks_device}",
                 f"    if ! cryptsetup status {luks_name} >/dev/null 2>&1; then",
                 f"        log_info \"Déverrouillage de {mp.luks_device}...\"",
@@ -501,14 +919,14 @@ class ScriptGenerator:
                 ""
             ])
         
-        self.script_lines.extend([
+        self._write(f, [
             "}",
             ""
         ])
     
-    def _add_filesystem_mounting(self):
+    def _add_filesystem_mounting(self, f):
         """Ajoute le montage des systèmes de fichiers"""
-        self.script_lines.extend([
+        self._write(f, [
             "# Montage des systèmes de fichiers",
             "mount_filesystems() {",
             "    log_info \"Montage des systèmes de fichiers...\"",
@@ -524,7 +942,7 @@ class ScriptGenerator:
             else:
                 source_device = mp.device
             
-            self.script_lines.extend([
+            self._write(f, [
                 f"    # Montage de {mp.mount_point}",
                 f"    check_device_exists \"{source_device}\"",
                 f"    create_mount_point \"{mount_target}\"",
@@ -533,21 +951,18 @@ class ScriptGenerator:
             
             mount_cmd = f"mount"
             
-            mount_options = []
-            if mp.btrfs_subvol:
-                mount_options.append(f"subvol={mp.btrfs_subvol}")
-            
-            for opt in mp.options:
-                if opt not in ['defaults', 'rw', 'auto', 'user', 'exec', 'suid']:
-                    if not opt.startswith('subvol='): 
-                        mount_options.append(opt)
+            mount_options = [f"subvol={mp.btrfs_subvol}"] if mp.btrfs_subvol else []
+            mount_options.extend(
+                opt for opt in mp.options
+                if opt not in _SKIP_OPTS and not opt.startswith('subvol=')
+            )
             
             if mount_options:
                 mount_cmd += f" -o {','.join(mount_options)}"
             
             mount_cmd += f" \"{source_device}\" \"{mount_target}\""
             
-            self.script_lines.extend([
+            self._write(f, [
                 f"    if ! mountpoint -q \"{mount_target}\"; then",
                 f"        {mount_cmd}",
                 f"        log_success \"Monté: {mp.mount_point}\"",
@@ -557,51 +972,18 @@ class ScriptGenerator:
                 ""
             ])
         
-        self.script_lines.extend([
+        self._write(f, [
             "}",
             ""
         ])
     
-    def _add_pseudo_filesystems(self):
+    def _add_pseudo_filesystems(self, f):
         """Ajoute le montage des pseudo-systèmes de fichiers"""
-        pseudo_fs = [
-            ("/dev", "/dev"),
-            ("/proc", "/proc"),
-            ("/sys", "/sys"),
-            ("/run", "/run")
-        ]
-        
-        self.script_lines.extend([
-            "# Montage des pseudo-systèmes de fichiers",
-            "mount_pseudo_filesystems() {",
-            "    log_info \"Montage des pseudo-systèmes de fichiers...\"",
-            ""
-        ])
-        
-        for source, target in pseudo_fs:
-            mount_target = f"$MOUNT_ROOT{target}"
-            self.script_lines.extend([
-                f"    create_mount_point \"{mount_target}\"",
-                f"    if ! mountpoint -q \"{mount_target}\"; then",
-                f"        mount --bind \"{source}\" \"{mount_target}\"",
-                f"        log_success \"Pseudo-FS monté: {target}\"",
-                f"    fi"
-            ])
-        
-        self.script_lines.extend([
-            "",
-            "    # Montage spécial pour /dev/pts si nécessaire",
-            "    if [[ -d \"$MOUNT_ROOT/dev/pts\" ]] && ! mountpoint -q \"$MOUNT_ROOT/dev/pts\"; then",
-            "        mount -t devpts devpts \"$MOUNT_ROOT/dev/pts\"",
-            "    fi",
-            "",
-            "}",
-            ""
-        ])
+        f.write(_PSEUDO_FILESYSTEMS)
     
-    def _add_chroot_execution(self):
+    def _add_chroot_execution(self, f):
         """Ajoute l'exécution du chroot"""
-        self.script_lines.extend([
+        self._write(f, [
             "# Exécution du chroot",
             "execute_chroot() {",
             "    log_info \"Entrée dans l'environnement chroot...\"",
@@ -621,9 +1003,9 @@ class ScriptGenerator:
             ""
         ])
     
-    def _add_cleanup(self):
+    def _add_cleanup(self, f):
         """Ajoute les fonctions de nettoyage"""
-        self.script_lines.extend([
+        self._write(f, [
             "# Fonction de nettoyage",
             "cleanup() {",
             "    log_info \"Nettoyage en cours...\"",
@@ -641,7 +1023,7 @@ class ScriptGenerator:
         
         for mp in reversed(self.mount_points):
             mount_target = f"$MOUNT_ROOT{mp.mount_point}"
-            self.script_lines.extend([
+            self._write(f, [
                 f"    if mountpoint -q \"{mount_target}\"; then",
                 f"        umount \"{mount_target}\" 2>/dev/null || true",
                 f"        log_info \"Démonté: {mp.mount_point}\"",
@@ -650,17 +1032,17 @@ class ScriptGenerator:
         
         luks_devices = [mp for mp in self.mount_points if mp.is_luks]
         if luks_devices:
-            self.script_lines.append("\n    # Fermeture des périphériques LUKS")
+            self._write(f, ["\n    # Fermeture des périphériques LUKS"])
             for mp in luks_devices:
                 luks_name = f"luks_{mp.uuid[:8]}" if mp.uuid else "luks_device"
-                self.script_lines.extend([
+                self._write(f, [
                     f"    if cryptsetup status {luks_name} >/dev/null 2>&1; then",
                     f"        cryptsetup close {luks_name} 2>/dev/null || true",
                     f"        log_info \"Fermé: {luks_name}\"",
                     f"    fi"
                 ])
         
-        self.script_lines.extend([
+        self._write(f, [
             "    ",
             "    log_success \"Nettoyage terminé\"",
             "}",
@@ -675,9 +1057,9 @@ class ScriptGenerator:
         ])
         
         if any(mp.is_luks for mp in self.mount_points):
-            self.script_lines.append("    unlock_luks_devices")
+            self._write(f, ["    unlock_luks_devices"])
         
-        self.script_lines.extend([
+        self._write(f, [
             "    mount_filesystems",
             "    mount_pseudo_filesystems",
             "    execute_chroot",
@@ -690,6 +1072,8 @@ class ScriptGenerator:
 
 def read_config(config_path="/etc/auto-archchroot/config.conf"):
     """Lit le fichier de configuration"""
+    #import différé: inutile pour l'analyse seule (tests, import du module)
+    import configparser
     config = configparser.ConfigParser()
     try:
         config.read(config_path)
@@ -700,6 +1084,7 @@ def read_config(config_path="/etc/auto-archchroot/config.conf"):
 
 def main():
     """Fonction principale"""
+    setup_logging()
     try:
         logger.info("Démarrage de l'analyseur système auto-archchroot")
         
@@ -1,7 +1,10 @@
+import subprocess
+
 import pytest
 
 from auto_archchroot import SystemAnalyzer
 from auto_archchroot import MountPoint
+from auto_archchroot import ScriptGenerator
 
 sys_analyser = SystemAnalyzer()
 
@@ -33,6 +36,273 @@ def test_detect_luks_devices(mocker):
         assert isinstance(luks, str)
         assert luks.startswith("/dev/mapper/luks-") or luks.startswith("UUID=")
 
+LSBLK_PAIRS = b"""NAME="sda" UUID="" FSTYPE="" MOUNTPOINT="" SIZE="107374182400" TYPE="disk" PKNAME=""
+NAME="sda1" UUID="1234-ABCD" FSTYPE="vfat" MOUNTPOINT="/boot" SIZE="1073741824" TYPE="part" PKNAME="sda"
+NAME="sda2" UUID="abcd-1234" FSTYPE="crypto_LUKS" MOUNTPOINT="" SIZE="106300440576" TYPE="part" PKNAME="sda"
+NAME="luks-1234" UUID="5678-EFGH" FSTYPE="btrfs" MOUNTPOINT="/" SIZE="106300440576" TYPE="crypt" PKNAME="sda2"
+NAME="sdb1" UUID="9999-0000" FSTYPE="ext4" MOUNTPOINT="/mnt/mes\\x20donnees" SIZE="1099511627776" TYPE="part" PKNAME="sdb"
+NAME="sdb2" UUID="9999-0001" FSTYPE="ext4" MOUNTPOINT="/mnt/donn\\xc3\\xa9es" SIZE="1099511627776" TYPE="part" PKNAME="sdb"
+NAME="sdc1" UUID="lvm-pv-0001" FSTYPE="LVM2_member" MOUNTPOINT="" SIZE="1099511627776" TYPE="part" PKNAME="sdc"
+NAME="vg-root" UUID="cafe-0001" FSTYPE="crypto_LUKS" MOUNTPOINT="" SIZE="1099511627776" TYPE="lvm" PKNAME="sdc1"
+NAME="cryptsrv" UUID="cafe-0002" FSTYPE="btrfs" MOUNTPOINT="/srv" SIZE="1099511627776" TYPE="crypt" PKNAME="vg-root"
+"""
+
+
+def fake_run_command(cmd):
+    if cmd[0] == 'lsblk':
+        return LSBLK_PAIRS, 0
+    return b"", 1
+
+
+def test_run_command(mocker):
+    """Tester que les commandes tournent sans stdin, sans stderr et en locale C"""
+
+    run = mocker.patch("subprocess.run")
+    run.return_value.stdout = b"sortie\n"
+    run.return_value.returncode = 0
+    assert SystemAnalyzer().run_command(["lsblk"]) == (b"sortie", 0)
+    kwargs = run.call_args.kwargs
+    assert kwargs["stdin"] == subprocess.DEVNULL
+    assert kwargs["stderr"] == subprocess.DEVNULL
+    assert kwargs["env"]["LC_ALL"] == "C"
+
+
+def test_probe_all(mocker):
+    """Tester que lsblk n'est appelé qu'une fois et que les index sont construits"""
+
+    mocker.patch.object(SystemAnalyzer, "_scan_block_devices", return_value=None)
+    mocker.patch.object(SystemAnalyzer, "_load_mountinfo", return_value={})
+    run = mocker.patch.object(SystemAnalyzer, "run_command", side_effect=fake_run_command)
+    analyzer = SystemAnalyzer()
+    assert run.call_count == 0
+    analyzer.parse_fstab("fstab_samples/fstab1")
+    analyzer.parse_fstab("fstab_samples/fstab3")
+
+    assert run.call_count == 1
+    assert analyzer.detect_luks_devices() == {"abcd-1234": "/dev/sda2", "cafe-0001": "/dev/mapper/vg-root"}
+    assert analyzer._resolve_device_uuid("1234-ABCD", analyzer.get_uuid_index()) == "/dev/sda1"
+    assert analyzer._detect_luks_for_mapper("/dev/mapper/luks-1234") == (True, "/dev/sda2", "abcd-1234")
+    assert analyzer._detect_luks_for_mapper("/dev/mapper/vg-root") == (False, None, None)
+    #LUKS sur LVM: le conteneur est le volume logique, sous /dev/mapper/
+    assert analyzer._detect_luks_for_mapper("/dev/mapper/cryptsrv") == (True, "/dev/mapper/vg-root", "cafe-0001")
+    device_info = analyzer.get_device_info()
+    assert device_info["/dev/sdb1"]["mountpoint"] == "/mnt/mes donnees"
+    #séquences multi-octets: UTF-8 reconstitué octet par octet
+    assert device_info["/dev/sdb2"]["mountpoint"] == "/mnt/données"
+    assert device_info["/dev/sda2"]["mountpoint"] is None
+    #taille en octets, comme sur le chemin sysfs
+    assert device_info["/dev/sda1"]["size"] == 1073741824
+
+    analyzer.invalidate()
+    analyzer.get_device_info()
+    assert run.call_count == 2
+
+
+def test_detect_btrfs_subvolumes_mounted(mocker):
+    """Tester que les sous-volumes d'un btrfs déjà monté sont listés sans montage temporaire"""
+
+    #btrfs-progs fournit btrfsutil sur la cible: forcer le repli sur la commande btrfs
+    mocker.patch("auto_archchroot.btrfsutil", None)
+    mocker.patch.object(SystemAnalyzer, "_scan_block_devices", return_value=None)
+    mocker.patch.object(SystemAnalyzer, "_load_mountinfo", return_value={})
+    mocker.patch.object(SystemAnalyzer, "run_command", side_effect=fake_run_command)
+    analyzer = SystemAnalyzer()
+    analyzer.get_device_info()
+    run = mocker.patch.object(analyzer, "run_command",
+                              return_value=(b"ID 256 gen 10 top level 5 path @\nID 257 gen 10 top level 5 path @home", 0))
+
+    assert analyzer.detect_btrfs_subvolumes("/dev/mapper/luks-1234") == ["@", "@home"]
+    run.assert_called_once_with(['btrfs', 'subvolume', 'list', '/'])
+
+    #conteneur LUKS: on passe par le mapper ouvert, sans montage temporaire
+    run.reset_mock()
+    assert analyzer.detect_btrfs_subvolumes("/dev/sda2") == ["@", "@home"]
+    run.assert_called_once_with(['btrfs', 'subvolume', 'list', '/'])
+
+    #conteneur LUKS sur LVM: retrouvé par son chemin /dev/mapper/, monté via son propre mapper
+    run.reset_mock()
+    assert analyzer.detect_btrfs_subvolumes("/dev/mapper/vg-root") == ["@", "@home"]
+    run.assert_called_once_with(['btrfs', 'subvolume', 'list', '/srv'])
+
+    #résultat mémorisé: pas de nouvel appel à btrfs
+    run.reset_mock()
+    assert analyzer.detect_btrfs_subvolumes("/dev/sda2") == ["@", "@home"]
+    run.assert_not_called()
+
+
+def test_list_btrfs_subvolumes_btrfsutil(mocker):
+    """Tester que libbtrfsutil, si disponible, remplace l'appel à btrfs subvolume list"""
+
+    btrfsutil = mocker.patch("auto_archchroot.btrfsutil")
+    btrfsutil.SubvolumeIterator.return_value = iter([("@", 256), ("@home", 257)])
+    analyzer = SystemAnalyzer()
+    run = mocker.patch.object(analyzer, "run_command")
+
+    assert analyzer._list_btrfs_subvolumes("/") == ["@", "@home"]
+    btrfsutil.SubvolumeIterator.assert_called_once_with("/", top=5)
+    run.assert_not_called()
+
+
+def test_list_btrfs_subvolumes_non_utf8(mocker):
+    """Tester qu'un nom de sous-volume non UTF-8 ne fait pas échouer la détection"""
+
+    mocker.patch("auto_archchroot.btrfsutil", None)
+    analyzer = SystemAnalyzer()
+    mocker.patch.object(analyzer, "run_command",
+                        return_value=(b"ID 256 gen 10 top level 5 path @\nID 257 gen 10 top level 5 path @donn\xe9es", 0))
+
+    assert analyzer._list_btrfs_subvolumes("/mnt") == ["@", "@donn\ufffdes"]
+
+
+def test_load_mountinfo(tmp_path):
+    """Tester le parsing de mountinfo, y compris les champs optionnels et les espaces échappés"""
+
+    mountinfo = tmp_path / "mountinfo"
+    mountinfo.write_text(
+        "29 1 0:26 /@ / rw,noatime shared:1 - btrfs /dev/mapper/luks-1234 rw,compress=zstd\n"
+        "30 29 0:26 /@home /home rw,noatime shared:2 - btrfs /dev/mapper/luks-1234 rw\n"
+        "31 29 8:1 / /mnt/usb\\040key rw - vfat /dev/sdb1 rw\n"
+    )
+
+    mounts = sys_analyser._load_mountinfo(str(mountinfo))
+    assert mounts["/dev/mapper/luks-1234"] == ("/", "btrfs", ["rw", "noatime"])
+    assert mounts["/dev/sdb1"] == ("/mnt/usb key", "vfat", ["rw"])
+
+
+def test_detect_luks_for_mapper_sysfs(mocker, tmp_path):
+    """Tester la résolution d'un mapper absent de lsblk via dm-N/slaves dans sysfs"""
+
+    sys_block = tmp_path / "class"
+    dev = tmp_path / "dev"
+    (dev / "mapper").mkdir(parents=True)
+
+    def add_dm(kernel_name, dm_name, slave, dm_uuid=None):
+        node = sys_block / kernel_name
+        (node / "slaves").mkdir(parents=True)
+        (node / "slaves" / slave).touch()
+        if dm_uuid is not None:
+            (node / "dm").mkdir()
+            (node / "dm" / "uuid").write_text(dm_uuid + "\n")
+        (dev / kernel_name).touch()
+        (dev / "mapper" / dm_name).symlink_to(dev / kernel_name)
+        return str(dev / "mapper" / dm_name)
+
+    cryptroot = add_dm("dm-3", "cryptroot", "sda2", "CRYPT-LUKS2-abcd1234-cryptroot")
+    vg_root = add_dm("dm-4", "vg-root", "sda1")
+    vg_home = add_dm("dm-5", "vg-home", "sda2", "LVM-abcdef")
+
+    mocker.patch.object(SystemAnalyzer, "_scan_block_devices", return_value=None)
+    mocker.patch.object(SystemAnalyzer, "_load_mountinfo", return_value={})
+    mocker.patch.object(SystemAnalyzer, "run_command", side_effect=fake_run_command)
+    analyzer = SystemAnalyzer()
+    analyzer.get_device_info()
+    backing = mocker.patch.object(
+        analyzer, "_luks_backing_from_sysfs",
+        side_effect=lambda device: SystemAnalyzer._luks_backing_from_sysfs(analyzer, device, str(sys_block)))
+
+    assert analyzer._detect_luks_for_mapper(cryptroot) == (True, "/dev/sda2", "abcd-1234")
+
+    #résultat mémorisé par mapper: sysfs n'est relu que pour un nouveau périphérique
+    assert analyzer._detect_luks_for_mapper(cryptroot) == (True, "/dev/sda2", "abcd-1234")
+    backing.assert_called_once()
+
+    #sans uuid dm: le slave doit être un conteneur LUKS connu
+    assert analyzer._detect_luks_for_mapper(vg_root) == (False, None, None)
+
+    #uuid dm LVM: rejeté même si le slave est un conteneur LUKS
+    assert analyzer._detect_luks_for_mapper(vg_home) == (False, None, None)
+
+
+def test_uuid_from_udev(tmp_path):
+    """Tester la lecture de l'UUID d'un conteneur LUKS dans la base udev"""
+
+    sys_block = tmp_path / "sys"
+    (sys_block / "nvme0n1p2").mkdir(parents=True)
+    (sys_block / "nvme0n1p2" / "dev").write_text("259:2\n")
+    udev = tmp_path / "udev"
+    udev.mkdir()
+    (udev / "b259:2").write_text("S:disk/by-uuid/aaaa-bbbb\nE:ID_FS_TYPE=crypto_LUKS\nE:ID_FS_UUID=aaaa-bbbb\n")
+
+    analyzer = SystemAnalyzer()
+    assert analyzer._uuid_from_udev("/dev/nvme0n1p2", str(sys_block), str(udev)) == "aaaa-bbbb"
+    assert analyzer._uuid_from_udev("/dev/sdz1", str(sys_block), str(udev)) is None
+
+
+def test_scan_block_devices(mocker, tmp_path):
+    """Tester la lecture de sysfs et de la base udev sans sous-processus"""
+
+    devices = tmp_path / "devices"
+    sys_block = tmp_path / "class"
+    udev = tmp_path / "udev"
+    udev.mkdir()
+    sys_block.mkdir()
+
+    def add(path, name, dev, **attrs):
+        node = devices / path
+        node.mkdir(parents=True)
+        (node / "dev").write_text(dev + "\n")
+        (node / "size").write_text("2048\n")
+        for attr, value in attrs.items():
+            (node / attr.replace("__", "/")).parent.mkdir(exist_ok=True)
+            (node / attr.replace("__", "/")).write_text(value)
+        (sys_block / name).symlink_to(node)
+        return node
+
+    add("sda", "sda", "8:0")
+    add("sda/sda2", "sda2", "8:2", partition="2")
+    dm = add("dm-0", "dm-0", "254:0", dm__name="luks-1234\n", dm__uuid="CRYPT-LUKS2-abcd1234-luks-1234\n")
+    (dm / "slaves").mkdir()
+    (dm / "slaves" / "sda2").touch()
+    (udev / "b8:0").write_text("E:ID_PART_TABLE_TYPE=gpt\n")
+    (udev / "b8:2").write_text("S:disk/by-uuid/abcd-1234\nE:ID_FS_UUID=abcd-1234\nE:ID_FS_TYPE=crypto_LUKS\n")
+    (udev / "b254:0").write_text("E:ID_FS_UUID=5678-EFGH\nE:ID_FS_TYPE=btrfs\n")
+
+    analyzer = SystemAnalyzer()
+    analyzer._mountinfo = {"/dev/mapper/luks-1234": ("/", "btrfs", ["rw"])}
+    device_info, uuid_to_device = analyzer._scan_block_devices(str(sys_block), str(udev))
+
+    assert device_info["/dev/sda2"] == {"uuid": "abcd-1234", "fstype": "crypto_LUKS", "mountpoint": None,
+                                        "size": 1048576, "type": "part", "pkname": "sda"}
+    assert device_info["/dev/luks-1234"]["type"] == "crypt"
+    assert device_info["/dev/luks-1234"]["pkname"] == "sda2"
+    assert device_info["/dev/luks-1234"]["mountpoint"] == "/"
+    assert uuid_to_device == {"abcd-1234": "/dev/sda2", "5678-EFGH": "/dev/luks-1234"}
+    assert analyzer._scan_block_devices(str(sys_block), str(tmp_path / "absent")) is None
+
+    #base udev incomplète (périphérique sans entrée) ou sans aucun système de fichiers: repli sur lsblk
+    (udev / "b8:0").unlink()
+    assert analyzer._scan_block_devices(str(sys_block), str(udev)) is None
+    (udev / "b8:0").write_text("E:ID_PART_TABLE_TYPE=gpt\n")
+    (udev / "b8:2").write_text("E:ID_PART_ENTRY_NUMBER=2\n")
+    (udev / "b254:0").write_text("E:DM_NAME=luks-1234\n")
+    assert analyzer._scan_block_devices(str(sys_block), str(udev)) is None
+
+    #LUKS sur LVM: le slave du mapper crypt est dm-1, nommé vg-root
+    add("sdc", "sdc", "8:32")
+    add("sdc/sdc1", "sdc1", "8:33", partition="1")
+    lv = add("dm-1", "dm-1", "254:1", dm__name="vg-root\n", dm__uuid="LVM-abcdef\n")
+    (lv / "slaves").mkdir()
+    (lv / "slaves" / "sdc1").touch()
+    crypt = add("dm-2", "dm-2", "254:2", dm__name="cryptsrv\n", dm__uuid="CRYPT-LUKS2-cafe0001-cryptsrv\n")
+    (crypt / "slaves").mkdir()
+    (crypt / "slaves" / "dm-1").touch()
+    (udev / "b8:32").write_text("E:ID_PART_TABLE_TYPE=gpt\n")
+    (udev / "b8:33").write_text("E:ID_FS_UUID=lvm-pv-0001\nE:ID_FS_TYPE=LVM2_member\n")
+    (udev / "b254:1").write_text("E:ID_FS_UUID=cafe-0001\nE:ID_FS_TYPE=crypto_LUKS\n")
+    (udev / "b254:2").write_text("E:ID_FS_UUID=cafe-0002\nE:ID_FS_TYPE=btrfs\n")
+    device_info, _ = analyzer._scan_block_devices(str(sys_block), str(udev))
+    assert device_info["/dev/vg-root"]["type"] == "lvm"
+    assert device_info["/dev/cryptsrv"]["pkname"] == "vg-root"
+
+    #le conteneur LUKS et le parent du mapper sont désignés par leur chemin /dev/mapper/
+    scan = SystemAnalyzer._scan_block_devices
+    mocker.patch.object(SystemAnalyzer, "_scan_block_devices", lambda self: scan(self, str(sys_block), str(udev)))
+    mocker.patch.object(SystemAnalyzer, "_load_mountinfo", return_value={})
+    probed = SystemAnalyzer()
+    assert probed.detect_luks_devices()["cafe-0001"] == "/dev/mapper/vg-root"
+    assert probed._detect_luks_for_mapper("/dev/mapper/cryptsrv") == (True, "/dev/mapper/vg-root", "cafe-0001")
+
+
 def test_parse_fstab_line(mocker):
     """Tester les lignes invalides"""
 
@@ -194,6 +464,15 @@ def test_create_mount_point_uuid_luks(mocker):
 
 
 
+def test_parse_fstab_missing_file(mocker):
+    """Tester qu'un fstab absent lève FileNotFoundError sans interroger le système"""
+
+    probe = mocker.patch.object(SystemAnalyzer, "_probe_all")
+    with pytest.raises(FileNotFoundError):
+        SystemAnalyzer().parse_fstab("fstab_samples/absent")
+    probe.assert_not_called()
+
+
 def test_parse_fstab_ext4_plaintxt(mocker):
     """Tester la méthode parse_fstab sans LUKS - fstab1"""
     mount_points = []
@@ -295,3 +574,38 @@ def test_parse_fstab_btrfs_LUKS(mocker):
 
     mount_points= [mp]
 #    assert sys_analyser.parse_fstab("fstab_samples/fstab4") == mount_points
+
+
+def test_generate_script(mocker, tmp_path):
+    """Tester la génération du script sans sous-processus, avec LUKS et btrfs"""
+
+    run = mocker.patch("subprocess.run")
+    mp = MountPoint(
+        device="/dev/mapper/luks-1234",
+        mount_point="/",
+        fs_type="btrfs",
+        options=["subvol=@", "compress=zstd", "defaults"],
+        uuid="abcd-1234",
+        is_luks=True,
+        luks_device="/dev/sda2",
+        btrfs_subvol="@",
+        order=0,
+    )
+    output = tmp_path / "perform-chroot.sh"
+
+    ScriptGenerator([mp]).generate_script(str(output))
+
+    script = output.read_text()
+    run.assert_not_called()
+    assert script.startswith("#!/bin/bash\n")
+    assert "cryptsetup open /dev/sda2 luks_abcd-123" in script
+    assert 'mount -o subvol=@,compress=zstd "/dev/mapper/luks_abcd-123" "$MOUNT_ROOT/"' in script
+    assert output.stat().st_mode & 0o777 == 0o755
+    assert [p.name for p in tmp_path.iterdir()] == ["perform-chroot.sh"]
+
+    #échec en cours d'écriture: l'ancien script est conservé, sans fichier temporaire résiduel
+    mocker.patch.object(ScriptGenerator, "_add_cleanup", side_effect=OSError("disque plein"))
+    with pytest.raises(OSError):
+        ScriptGenerator([mp]).generate_script(str(output))
+    assert output.read_text() == script
+    assert [p.name for p in tmp_path.iterdir()] == ["perform-chroot.sh"]